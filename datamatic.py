@@ -59,6 +59,13 @@ def parse_args():
         help="A path to the dest directory that will contain all rendered files"
     )
 
+    for subparser in [inplace, package]:
+        subparser.add_argument(
+            "-c", "--cache-dir",
+            type=pathlib.Path,
+            help="A directory for caching rendered templates; unchanged templates are not re-rendered"
+        )
+
     return parser.parse_args()
 
 
@@ -66,8 +73,8 @@ if __name__ == "__main__":
     args = parse_args()
     spec = args.spec
     if args.command == "inplace":
-        main.main_inplace(spec, args.dir)
+        main.main_inplace(spec, args.dir, args.cache_dir)
     elif args.command == "package":
-        main.main_package(spec, args.src, args.dst)
+        main.main_package(spec, args.src, args.dst, args.cache_dir)
     else:
         print("No command specified")
@@ -0,0 +1,54 @@
+"""
+A cache of rendered templates, so that unchanged templates do not need to be rendered again
+on the next run.
+"""
+import hashlib
+import json
+import os
+import pathlib
+from typing import Optional
+
+
+# The directory containing datamatic's own source, which is part of every cache key.
+PACKAGE_DIR = pathlib.Path(__file__).parent
+
+
+def context_digest(spec, dmx_files, package_dir: pathlib.Path = PACKAGE_DIR) -> bytes:
+    """
+    Returns a digest of everything other than the template that affects the rendered output;
+    the spec, the source of datamatic itself and the source of the dmx files providing custom
+    functions. Modules imported by the dmx files are not included.
+    """
+    digest = hashlib.blake2b(json.dumps(spec, sort_keys=True).encode())
+    for file in [*sorted(package_dir.glob("*.py")), *sorted(dmx_files)]:
+        # Each file is hashed separately so that moving text between files changes the digest
+        digest.update(hashlib.blake2b(file.read_bytes()).digest())
+    return digest.digest()
+
+
+class OutputCache:
+    """
+    A directory of rendered templates, keyed on a hash of the template text combined with
+    the context digest.
+    """
+    def __init__(self, directory: pathlib.Path, digest: bytes):
+        self.directory = directory
+        self.digest = digest
+
+    def key(self, template: str) -> str:
+        return hashlib.blake2b(self.digest + template.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with (self.directory / key).open(newline="") as cachefile:
+                return cachefile.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, text: str):
+        # Written to a temporary file first, as other workers may be writing the same key
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmpfile = self.directory / f"{key}.{os.getpid()}.tmp"
+        with tmpfile.open("w", newline="") as cachefile:
+            cachefile.write(text)
+        os.replace(tmpfile, self.directory / key)
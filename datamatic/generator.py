@@ -1,13 +1,14 @@
 import re
+import sys
 from typing import Tuple, Literal, Optional
 from dataclasses import dataclass
-from functools import partial
-import parse
+from functools import partial, lru_cache
 import ast
 from . import utilities
 
 
 TOKEN = re.compile(r"\{\{(.*?)\}\}")
+CALL = re.compile(r"(.+?)\((.*)\)")
 
 
 class GeneratorError(Exception):
@@ -18,9 +19,15 @@ class GeneratorError(Exception):
     def __str__(self):
         return f"[{self.file}] {super().__str__()}"
 
+    def __reduce__(self):
+        # Needed to re-raise errors from worker processes, as the default only keeps self.args
+        return self.__class__, (self.file, *self.args)
+
 
 @dataclass
 class Context:
+    __slots__ = ("spec", "comp", "attr", "flags")  # One is created per token replacement
+
     spec: list
     comp: dict
     attr: Optional[dict]  # Only populated for attrmethods
@@ -47,30 +54,43 @@ def parse_token_string(file, raw_string: str) -> Token:
     Comp::if_nth_else(2, ",", ".")
     Comp::name
     """
+    try:
+        return parse_token(raw_string)
+    except ValueError as e:
+        raise GeneratorError(file, str(e))
+
+
+@lru_cache(maxsize=4096)
+def parse_token(raw_string: str) -> Token:
+    """
+    Implementation of parse_token_string. The same tokens appear for every component and
+    attribute in a block, so results are cached on the raw string. Raises ValueError if the
+    token is invalid.
+    """
     try:
         namespace, rest = raw_string.split("::")
     except ValueError as e:
-        raise GeneratorError(file, f"Invalid token: {e}, {raw_string=}")
-
-    if result := parse.parse("{}({})", rest):
-        function_name = result[0]
-        try:
-            args = tuple(ast.literal_eval(result[1]))
-        except SyntaxError:
-            raise GeneratorError(file, f"Could not parse arg list ({result[1]}) for function {function_name}")
-    elif result := parse.parse("{}()", rest):
-        function_name = result[0]
+        raise ValueError(f"Invalid token: {e}, {raw_string=}")
+
+    # Most tokens are plain property lookups, so only run the regex if there could be a call
+    if rest.endswith(")") and (match := CALL.fullmatch(rest)):
+        function_name, arg_string = match.groups()
         args = tuple()
+        if arg_string:
+            try:
+                args = tuple(ast.literal_eval(arg_string))
+            except SyntaxError:
+                raise ValueError(f"Could not parse arg list ({arg_string}) for function {function_name}")
     else:
         function_name = rest
         args = tuple()
 
     return Token(
-        namespace=namespace,
-        function_name=function_name,
+        namespace=sys.intern(namespace),
+        function_name=sys.intern(function_name),
         args=args,
     )
-    
+
 
 def apply_flags_to_spec(spec, flags):
     """
@@ -112,52 +132,39 @@ def replace_token(matchobj, file, comp, attr, spec, flags, method_register):
     return function(ctx, *token.args)
 
 
-def process_block(file, block, flags, spec, method_register):
-    out = ""
-    for comp in spec["components"]:
-        if not utilities.flag_match(comp, flags):
-            continue
+def substitute(line, marker, replacer):
+    """
+    Replaces tokens in the line using the given replacer for as long as the line contains the
+    marker. Returns the new line and whether any substitution was made.
+    """
+    substituted = False
+    while marker in line:
+        substituted = True
+        line = TOKEN.sub(replacer, line)
+    return line, substituted
+
 
+def process_block(file, block, flags, spec, method_register):
+    out = []
+    replacer = partial(replace_token, file=file, spec=spec, flags=flags, method_register=method_register)
+    for comp in utilities.filter_flags(spec["components"], flags):
+        comp_replacer = partial(replacer, comp=comp, attr=None)
+        attrs = utilities.filter_flags(comp["attributes"], flags)
+        attr_replacers = [partial(replacer, comp=comp, attr=attr) for attr in attrs]
         for line in block:
-            had_comp_substitute = False
-            while "{{Comp::" in line:
-                had_comp_substitute = True
-                line = TOKEN.sub(partial(
-                    replace_token,
-                    file=file,
-                    comp=comp,
-                    attr=None,
-                    spec=spec,
-                    flags=flags,
-                    method_register=method_register
-                ), line)
+            line, had_comp_substitute = substitute(line, "{{Comp::", comp_replacer)
 
             if "{{Attr::" in line:
-                for attr in comp["attributes"]:
-                    if not utilities.flag_match(attr, flags):
-                        continue
-
-                    newline = line
-                    had_attr_substitute = False
-                    while "{{Attr::" in newline:
-                        had_attr_substitute = True
-                        newline = TOKEN.sub(partial(
-                            replace_token,
-                            file=file,
-                            comp=comp,
-                            attr=attr,
-                            spec=spec,
-                            flags=flags,
-                            method_register=method_register
-                        ), newline)
+                for attr_replacer in attr_replacers:
+                    newline, had_attr_substitute = substitute(line, "{{Attr::", attr_replacer)
 
                     if not (had_attr_substitute and line == ""): # If a symbol substitution resulted in an empty line, don't add it
-                        out += newline + "\n"
+                        out.append(newline + "\n")
             else:
                 if not (had_comp_substitute and line == ""):  # If a symbol substitution resulted in an empty line, don't add it
-                    out += line + "\n"
+                    out.append(line + "\n")
 
-    return out
+    return "".join(out)
 
 
 def parse_flag_val(val):
@@ -178,20 +185,45 @@ def parse_flags(flags):
     return parsed_flags
 
 
-def run(src, dst, spec, method_register):
+def run(src, dst, spec, method_register, cache=None):
     with src.open() as srcfile:
         lines = srcfile.readlines()
 
+    if cache is None:
+        text = render(src, lines, spec, method_register)
+    else:
+        key = cache.key("".join(lines))
+        if (text := cache.get(key)) is None:
+            text = render(src, lines, spec, method_register)
+            cache.put(key, text)
+
+    if dst.exists():
+        with dst.open() as dstfile:
+            if dstfile.read() == text:
+                print(f"No change to {dst}")
+                return False
+
+    with dst.open("w") as dstfile:
+        dstfile.write(text)
+
+    print(f"Generated file {dst}")
+    return True
+
+
+def render(src, lines, spec, method_register):
+    """
+    Renders the lines of the given template file, returning the generated text.
+    """
     in_block = False
     block = []
     flags = set()
-    out = ""
+    out = []
     for line in lines:
         line = line.rstrip()
 
         # Globals can appear on any line, outside of Datamatic blocks
-        while "{{Global::" in line:
-            line = TOKEN.sub(partial(
+        if "{{Global::" in line:
+            line, _ = substitute(line, "{{Global::", partial(
                 replace_token,
                 file=src,
                 comp=None,
@@ -199,13 +231,13 @@ def run(src, dst, spec, method_register):
                 spec=spec,
                 flags=flags,
                 method_register=method_register
-            ), line)
+            ))
 
         if in_block:
             if line.startswith("DATAMATIC_BEGIN"):
                 raise RuntimeError("Tried to begin a datamatic block while in another, cannot be nested")
             if line.startswith("DATAMATIC_END"):
-                out += process_block(src, block, flags, spec, method_register)
+                out.append(process_block(src, block, flags, spec, method_register))
                 in_block = False
                 block = []
                 flags = set()
@@ -215,16 +247,6 @@ def run(src, dst, spec, method_register):
             in_block = True
             flags = parse_flags(set(line.split()[1:]))
         else:
-            out += line + "\n"
-
-    if dst.exists():
-        with dst.open() as dstfile:
-            if dstfile.read() == out:
-                print(f"No change to {dst}")
-                return False
-
-    with dst.open("w") as dstfile:
-        dstfile.write(out)
+            out.append(line + "\n")
 
-    print(f"Generated file {dst}")
-    return True
+    return "".join(out)
@@ -4,16 +4,34 @@ Command line parser for datamatic.
 import os
 import pathlib
 import json
+import math
 import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 
-from . import validator, generator, method_register
+from . import validator, generator, method_register, utilities
+from .cache import OutputCache, context_digest
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the standard library parser
+    orjson = None
+
+
+# Shared stand-in for objects without a "flags" field; never mutated.
+NO_FLAGS = {}
 
 
 def load_spec(specfile: pathlib.Path):
-    with specfile.open() as specfile_handle:
-        spec = json.load(specfile_handle)
+    with specfile.open("rb") as specfile_handle:
+        if orjson is not None:
+            spec = orjson.loads(specfile_handle.read())
+        else:
+            spec = json.load(specfile_handle)
     fill_flag_defaults(spec)
     validator.run(spec)
+    intern_keys(spec)
     return spec
 
 
@@ -23,60 +41,133 @@ def fill_flag_defaults(spec):
         
     defaults = spec["flag_defaults"]
     for comp in spec["components"]:
-        comp_flags = comp.get("flags", {})
-        comp["flags"] = {**defaults, **comp_flags}
+        comp["flags"] = {**defaults, **comp.get("flags", NO_FLAGS)}
         for attr in comp["attributes"]:
-            attr_flags = attr.get("flags", {})
-            attr["flags"] = {**defaults, **attr_flags}
+            attr["flags"] = {**defaults, **attr.get("flags", NO_FLAGS)}
 
 
-def main_inplace(specfile: pathlib.Path, directory: pathlib.Path):
+def intern_keys(spec):
     """
-    Entry point for the inplace tool.
+    Interns the keys of every component and attribute in place. Token function names are
+    interned too, so property lookups such as Comp::name match keys by identity.
     """
-    spec = load_spec(specfile)
+    for comp in spec["components"]:
+        for obj in [comp, *comp["attributes"]]:
+            for key in list(obj):
+                obj[sys.intern(key)] = obj.pop(key)
+
+
+def make_cache(spec, directory: pathlib.Path, cache_dir: Optional[pathlib.Path]):
+    """
+    Returns an output cache stored in cache_dir for the given spec and the dmx files in the
+    given directory, or None if no cache_dir is given.
+    """
+    if cache_dir is None:
+        return None
+    dmx_files = utilities.find_files(directory, lambda name: name.endswith(".dmx.py"), cache_dir)
+    return OutputCache(cache_dir, context_digest(spec, dmx_files))
 
+
+# Templates are sent to workers in chunks of this size. Runs that fit in a single chunk would
+# only use one worker, so they are rendered in this process without starting a pool.
+CHUNK_SIZE = 8
+
+
+def make_register(directory: pathlib.Path):
+    """
+    Returns a method register with the builtins and the dmx files in the given directory.
+    """
     reg = method_register.MethodRegister()
     reg.load_builtins()
     reg.load_from_dmx(directory)
+    return reg
+
+
+# The spec, method register and cache used by a worker process, set up once by init_worker.
+_worker_spec = None
+_worker_register = None
+_worker_cache = None
+
+
+def init_worker(spec, directory: pathlib.Path, cache: Optional[OutputCache]):
+    """
+    Initialiser for worker processes. The method register holds functions defined in dmx
+    files which cannot be pickled, so each worker builds its own.
+    """
+    global _worker_spec, _worker_register, _worker_cache
+    # Done per worker because under the spawn and forkserver start methods the spec is
+    # pickled, and unpickled strings are not interned
+    intern_keys(spec)
+    _worker_spec = spec
+    _worker_register = make_register(directory)
+    _worker_cache = cache
+
+
+def render_in_worker(srcfile: pathlib.Path, dstfile: pathlib.Path):
+    """
+    Renders a single template inside of a worker process.
+    """
+    return generator.run(srcfile, dstfile, _worker_spec, _worker_register, _worker_cache)
+
+
+def render_all(spec, directory: pathlib.Path, srcfiles, dstfiles, cache: Optional[OutputCache] = None):
+    """
+    Renders each template to its destination, using the dmx files found in the given directory.
+    Larger runs are rendered in parallel. Returns the number of files that were written.
+    """
+    if len(set(dstfiles)) != len(dstfiles):
+        seen = {}
+        for srcfile, dstfile in zip(srcfiles, dstfiles):
+            if dstfile in seen:
+                raise RuntimeError(f"Templates {seen[dstfile]} and {srcfile} would both be rendered to {dstfile}")
+            seen[dstfile] = srcfile
+
+    if len(srcfiles) <= CHUNK_SIZE:
+        reg = make_register(directory)
+        return sum(generator.run(srcfile, dstfile, spec, reg, cache) for srcfile, dstfile in zip(srcfiles, dstfiles))
+
+    # Only start as many workers as there are chunks, as each one loads the dmx files
+    max_workers = min(os.cpu_count() or 1, math.ceil(len(srcfiles) / CHUNK_SIZE))
+    with ProcessPoolExecutor(max_workers, initializer=init_worker, initargs=(spec, directory, cache)) as executor:
+        return sum(executor.map(render_in_worker, srcfiles, dstfiles, chunksize=CHUNK_SIZE))
 
-    count = 0
-    for srcfile in directory.glob("**/*.dm.*"):
-        dstfile = srcfile.parent / srcfile.name.replace(".dm.", ".")
-        if generator.run(srcfile, dstfile, spec, reg):
-            count += 1
+
+def main_inplace(specfile: pathlib.Path, directory: pathlib.Path, cache_dir: Optional[pathlib.Path] = None):
+    """
+    Entry point for the inplace tool.
+    """
+    spec = load_spec(specfile)
+
+    srcfiles = list(utilities.find_files(directory, lambda name: ".dm." in name, cache_dir))
+    dstfiles = [srcfile.parent / srcfile.name.replace(".dm.", ".") for srcfile in srcfiles]
+    count = render_all(spec, directory, srcfiles, dstfiles, make_cache(spec, directory, cache_dir))
 
     print(f"Done! Generated {count} files")
     return count
 
 
-def main_package(specfile: pathlib.Path, src: pathlib.Path, dst: pathlib.Path):
+def main_package(specfile: pathlib.Path, src: pathlib.Path, dst: pathlib.Path,
+                 cache_dir: Optional[pathlib.Path] = None):
     """
     Entry point for the package tool.
     """
     spec = load_spec(specfile)
 
-    reg = method_register.MethodRegister()
-    reg.load_builtins()
-    reg.load_from_dmx(src)
-
     if dst.exists():
         print("Deleting old dst directory")
         shutil.rmtree(str(dst))
     print("Creating new dst directory")
     os.mkdir(str(dst))
 
-    count = 0
-    ignore = set(src.glob("**/*.dmx.py")) | set(src.glob("**/*.pyc"))
-    templates = set(src.glob("**/*.dm.*"))
-    for srcfile in src.glob("**/*"):
-        if srcfile in ignore:
+    srcfiles = []
+    dstfiles = []
+    for srcfile in utilities.find_files(src, lambda name: True, cache_dir):  # The cache may be inside src
+        if srcfile.name.endswith((".dmx.py", ".pyc")):
             continue  # Ignore plugins
 
-        if srcfile in templates:
-            dstfile = dst / srcfile.name.replace(".dm.", ".")
-            if generator.run(srcfile, dstfile, spec, reg):
-                count += 1
+        if ".dm." in srcfile.name:
+            srcfiles.append(srcfile)
+            dstfiles.append(dst / srcfile.name.replace(".dm.", "."))
         else:
             dstfile = dst / srcfile.name
             try:
@@ -84,5 +175,7 @@ def main_package(specfile: pathlib.Path, src: pathlib.Path, dst: pathlib.Path):
             except PermissionError:
                 pass
 
+    count = render_all(spec, src, srcfiles, dstfiles, make_cache(spec, src, cache_dir))
+
     print(f"Done! Generated {count} files")
     return count
@@ -5,14 +5,33 @@ custom behaviour.
 """
 import pathlib
 import importlib.util
-from functools import partialmethod
+from functools import partialmethod, lru_cache
 
 from . import utilities
 
 
+# Fallbacks used when no method is registered under a name; each builds a
+# function that does a plain property lookup on the relevant part of the context.
+DEFAULT_LOOKUPS = {
+    "Global": lambda name: lambda ctx: ctx.spec[name],
+    "Comp": lambda name: lambda ctx: ctx.comp[name],
+    "Attr": lambda name: lambda ctx: ctx.attr[name],
+}
+
+
+@lru_cache(maxsize=None)
+def default_lookup(namespace, function_name):
+    """
+    Returns the property lookup function for the given name. These are built once per
+    name rather than once per token.
+    """
+    return DEFAULT_LOOKUPS.get(namespace, DEFAULT_LOOKUPS["Attr"])(function_name)
+
+
 class MethodRegister:
     def __init__(self):
         self.methods = {}
+        self.pending_dmx = []  # dmx files found by load_from_dmx but not yet imported
 
     def register_method(self, function, namespace):
         fn_name = function.__name__
@@ -26,13 +45,11 @@ class MethodRegister:
     globalmethod = partialmethod(register_method, namespace="Global")
 
     def get(self, namespace, function_name):
-        if (namespace, function_name) in self.methods:
-            return self.methods[namespace, function_name]
-        if namespace == "Global":
-            return lambda ctx: ctx.spec[function_name]
-        if namespace == "Comp":
-            return lambda ctx: ctx.comp[function_name]
-        return lambda ctx: ctx.attr[function_name]
+        if self.pending_dmx:
+            self.load_pending_dmx()
+        if function := self.methods.get((namespace, function_name)):
+            return function
+        return default_lookup(namespace, function_name)
 
     def load_builtins(self):
         """
@@ -83,11 +100,27 @@ class MethodRegister:
 
     def load_from_dmx(self, directory: pathlib.Path):
         """
-        A function that scans the given directory for dmx files, and runs the
-        main function in each to load up custom functions.
+        A function that scans the given directory for dmx files. The files are not imported
+        until the first method lookup, so a run that never looks up a method doesn't pay for them.
         """
-        for file in directory.glob("**/*.dmx.py"):
-            spec = importlib.util.spec_from_file_location(file.stem, file)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
-            module.main(self)
+        self.pending_dmx.extend(utilities.find_files(directory, lambda name: name.endswith(".dmx.py")))
+
+    def load_pending_dmx(self):
+        """
+        Imports each dmx file found by load_from_dmx, running the main function in each to
+        load up custom functions.
+        """
+        while self.pending_dmx:
+            # Popped before loading so that a dmx file looking up a method doesn't load itself
+            # again. On failure, everything is rolled back to before this file, so later lookups
+            # raise the same error rather than miss its methods or clash with a partial load.
+            methods, pending = dict(self.methods), list(self.pending_dmx)
+            file = self.pending_dmx.pop(0)
+            try:
+                spec = importlib.util.spec_from_file_location(file.stem, file)
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                module.main(self)
+            except BaseException:
+                self.methods, self.pending_dmx = methods, pending
+                raise
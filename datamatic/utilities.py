@@ -2,6 +2,8 @@
 A module of utility functions to be used in both the core datamatic implmentation as
 well as being made available to plugins.
 """
+import os
+import pathlib
 
 
 def flag_match(obj, flags):
@@ -9,9 +11,10 @@ def flag_match(obj, flags):
     Given a component or attribute, return true if it matches all of the given flags
     and False otherwise. If there are no flags, always return True.
     """
-    if "flags" in obj:
-        return all(obj['flags'][key] == value for key, value in flags.items())
-    return True
+    obj_flags = obj.get("flags")
+    if obj_flags is None:
+        return True
+    return all(obj_flags[key] == value for key, value in flags.items())
 
 
 def filter_flags(obj_list, flags):
@@ -20,3 +23,21 @@ def filter_flags(obj_list, flags):
     only the objects that match the flags.
     """
     return [obj for obj in obj_list if flag_match(obj, flags)]
+
+
+def find_files(directory, predicate, exclude=None):
+    """
+    Recursively scans the given directory and yields the path of every file whose name
+    satisfies the given predicate. Symlinked directories are not followed, and if an exclude
+    directory is given then nothing inside of it is scanned.
+    """
+    exclude = os.path.abspath(exclude) if exclude is not None else None
+    stack = [directory]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if exclude is None or os.path.abspath(entry.path) != exclude:
+                        stack.append(entry.path)
+                elif entry.is_file() and predicate(entry.name):
+                    yield pathlib.Path(entry.path)
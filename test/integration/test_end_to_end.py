@@ -2,6 +2,7 @@
 An integration test that uses a specfile and a template file.
 """
 import shutil
+import sys
 from pathlib import Path
 from typing import Optional
 from datamatic import main
@@ -59,4 +60,130 @@ def test_file_is_not_rewritten_if_no_change(src_path, tmp_path):
     copy_file(src_path, tmp_path, "expected.cpp", "actual.cpp")
 
     specfile = src_path / "component_spec.json"
-    assert main.main_inplace(specfile, tmp_path) == 0
\ No newline at end of file
+    assert main.main_inplace(specfile, tmp_path) == 0
+
+
+def test_end_to_end_inplace_multiple_files(src_path, tmp_path):
+    """
+    Larger runs are rendered in worker processes; verify that every template in the tree is
+    generated when there are more templates than fit in one chunk.
+    """
+    subdirs = [f"dir{i}" for i in range(main.CHUNK_SIZE + 2)]
+    copy_file(src_path, tmp_path, "custom_functions.dmx.py")
+    for subdir in subdirs:
+        (tmp_path / subdir).mkdir()
+        copy_file(src_path, tmp_path / subdir, "actual.dm.cpp")
+
+    specfile = src_path / "component_spec.json"
+    assert main.main_inplace(specfile, tmp_path) == len(subdirs)
+
+    with (src_path / "expected.cpp").open() as expected_file:
+        expected = expected_file.read()
+
+    for subdir in subdirs:
+        with (tmp_path / subdir / "actual.cpp").open() as actual:
+            assert expected == actual.read()
+
+
+def test_end_to_end_inplace_with_cache(src_path, tmp_path):
+    """
+    Run datamatic twice with a cache directory. The second run should take the rendered output
+    from the cache rather than rendering the template again, which we check by tampering with
+    the cached output.
+    """
+    project = tmp_path / "project"
+    project.mkdir()
+    cache_dir = tmp_path / "cache"
+    copy_file(src_path, project, "actual.dm.cpp")
+    copy_file(src_path, project, "custom_functions.dmx.py")
+
+    specfile = src_path / "component_spec.json"
+    assert main.main_inplace(specfile, project, cache_dir) == 1
+
+    cached = list(cache_dir.iterdir())
+    assert len(cached) == 1
+    with (src_path / "expected.cpp").open() as expected, cached[0].open() as actual:
+        assert expected.read() == actual.read()
+
+    cached[0].write_text("from the cache\n")
+    (project / "actual.cpp").unlink()
+    assert main.main_inplace(specfile, project, cache_dir) == 1
+    assert (project / "actual.cpp").read_text() == "from the cache\n"
+
+
+def test_end_to_end_package(src_path, tmp_path):
+    """
+    Package a source tree with nested directories. Templates are rendered into the
+    destination, other files are copied across and datamatic files are left out.
+    """
+    src = tmp_path / "src"
+    (src / "nested").mkdir(parents=True)
+    copy_file(src_path, src / "nested", "actual.dm.cpp")
+    copy_file(src_path, src, "custom_functions.dmx.py")
+    (src / "readme.txt").write_text("plain file\n")
+    (src / "nested" / "stale.pyc").write_bytes(b"")
+
+    dst = tmp_path / "dst"
+    specfile = src_path / "component_spec.json"
+    assert main.main_package(specfile, src, dst) == 1
+
+    assert {path.name for path in dst.iterdir()} == {"actual.cpp", "readme.txt"}
+    assert (dst / "readme.txt").read_text() == "plain file\n"
+    with (src_path / "expected.cpp").open() as expected, (dst / "actual.cpp").open() as actual:
+        assert expected.read() == actual.read()
+
+
+def test_package_templates_with_the_same_destination(src_path, tmp_path):
+    """
+    Package mode flattens the source tree, so two templates with the same name in different
+    directories would be rendered to the same file. This is an error.
+    """
+    src = tmp_path / "src"
+    for subdir in ["a", "b"]:
+        (src / subdir).mkdir(parents=True)
+        copy_file(src_path, src / subdir, "actual.dm.cpp")
+    copy_file(src_path, src, "custom_functions.dmx.py")
+
+    specfile = src_path / "component_spec.json"
+    with pytest.raises(RuntimeError):
+        main.main_package(specfile, src, tmp_path / "dst")
+
+
+def test_intern_keys():
+    attr = {"".join(["na", "me"]): "x"}
+    comp = {"".join(["na", "me"]): "a", "attributes": [attr]}
+    main.intern_keys({"components": [comp]})
+
+    assert list(comp) == ["name", "attributes"]
+    assert next(iter(comp)) is sys.intern("name")
+    assert next(iter(attr)) is sys.intern("name")
+
+
+def test_load_spec_without_orjson(src_path, monkeypatch):
+    """
+    orjson is optional; make sure the standard library fallback loads the spec the same way.
+    """
+    specfile = src_path / "component_spec.json"
+    spec = main.load_spec(specfile)
+
+    monkeypatch.setattr(main, "orjson", None)
+    assert main.load_spec(specfile) == spec
+
+
+def test_end_to_end_package_with_cache_inside_src(src_path, tmp_path):
+    """
+    The cache directory may live inside the source tree. Its entries must not be copied into
+    the destination, even once it has been populated by an earlier run.
+    """
+    src = tmp_path / "src"
+    src.mkdir()
+    copy_file(src_path, src, "actual.dm.cpp")
+    copy_file(src_path, src, "custom_functions.dmx.py")
+
+    dst = tmp_path / "dst"
+    specfile = src_path / "component_spec.json"
+    for _ in range(2):
+        assert main.main_package(specfile, src, dst, src / ".datamatic-cache") == 1
+        assert {path.name for path in dst.iterdir()} == {"actual.cpp"}
+
+    assert len(list((src / ".datamatic-cache").iterdir())) == 1
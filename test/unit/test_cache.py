@@ -0,0 +1,49 @@
+"""
+Output cache unit tests.
+"""
+import shutil
+from datamatic import cache
+
+
+def test_cache_round_trip(tmp_path):
+    output_cache = cache.OutputCache(tmp_path / "cache", b"digest")
+    key = output_cache.key("template")
+
+    assert output_cache.get(key) is None
+    output_cache.put(key, "rendered\r\n")
+    assert output_cache.get(key) == "rendered\r\n"
+
+
+def test_cache_key_depends_on_template_and_digest(tmp_path):
+    first = cache.OutputCache(tmp_path, b"first")
+    second = cache.OutputCache(tmp_path, b"second")
+
+    assert first.key("a") == first.key("a")
+    assert first.key("a") != first.key("b")
+    assert first.key("a") != second.key("a")
+
+
+def test_context_digest(tmp_path):
+    dmx = tmp_path / "custom.dmx.py"
+    dmx.write_text("def main(register): pass\n")
+    spec = {"components": []}
+
+    digest = cache.context_digest(spec, [dmx])
+    assert digest == cache.context_digest({"components": []}, [dmx])
+    assert digest != cache.context_digest({"components": [], "extra": 1}, [dmx])
+
+    dmx.write_text("def main(register):\n    pass\n")
+    assert digest != cache.context_digest(spec, [dmx])
+
+
+def test_context_digest_includes_datamatic_source(tmp_path):
+    package_dir = tmp_path / "datamatic"
+    shutil.copytree(cache.PACKAGE_DIR, package_dir, ignore=shutil.ignore_patterns("__pycache__"))
+    spec = {"components": []}
+
+    digest = cache.context_digest(spec, [], package_dir)
+    assert digest == cache.context_digest(spec, [], package_dir)
+
+    generator = package_dir / "generator.py"
+    generator.write_text(generator.read_text() + "\n# changed\n")
+    assert digest != cache.context_digest(spec, [], package_dir)
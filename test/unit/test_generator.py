@@ -2,6 +2,8 @@ from datamatic import generator, method_register, main
 from datamatic.generator import Token
 import pytest
 from pathlib import Path
+import copy
+import pickle
 
 
 @pytest.mark.parametrize("raw,token", [
@@ -30,6 +32,18 @@ def test_parse_token_string_failure(raw):
         generator.parse_token_string("file", raw)
 
 
+def test_generator_error_survives_pickling():
+    error = pickle.loads(pickle.dumps(generator.GeneratorError("file", "message")))
+    assert error.file == "file"
+    assert str(error) == "[file] message"
+
+
+def test_token_survives_pickling_and_copying():
+    token = Token("Comp", "foo", ("a",))
+    assert pickle.loads(pickle.dumps(token)) == token
+    assert copy.deepcopy(token) == token
+
+
 def test_parse_flag_value():
     assert generator.parse_flag_val("true") == True
     assert generator.parse_flag_val("false") == False
@@ -192,4 +206,12 @@ def test_flagless_spec():
     }
     main.fill_flag_defaults(spec)
 
-    assert generator.apply_flags_to_spec(spec, {}) == spec
\ No newline at end of file
+    assert generator.apply_flags_to_spec(spec, {}) == spec
+
+
+def test_substitute():
+    def replacer(match):
+        return match.group(1).split("::")[1].upper()
+
+    assert generator.substitute("{{Comp::a}} {{Comp::b}}", "{{Comp::", replacer) == ("A B", True)
+    assert generator.substitute("{{Attr::a}}", "{{Comp::", replacer) == ("{{Attr::a}}", False)
@@ -107,4 +107,53 @@ def test_builtin_conditionals_attr(reg, attribute):
     assert reg.get("Attr", "if_first")(ctx, "a") == "a"
     assert reg.get("Attr", "if_not_first")(ctx, "a") == ""
     assert reg.get("Attr", "if_last")(ctx, "a") == "a"
-    assert reg.get("Attr", "if_not_last")(ctx, "a") == ""
\ No newline at end of file
+    assert reg.get("Attr", "if_not_last")(ctx, "a") == ""
+
+
+def test_dmx_files_are_loaded_on_first_lookup(tmp_path):
+    dmx = tmp_path / "lazy.dmx.py"
+    dmx.write_text(
+        "def main(register):\n"
+        "    @register.compmethod\n"
+        "    def lazy_function(ctx):\n"
+        "        return 'lazy'\n"
+    )
+
+    mreg = method_register.MethodRegister()
+    mreg.load_from_dmx(tmp_path)
+    assert ("Comp", "lazy_function") not in mreg.methods
+
+    assert mreg.get("Comp", "lazy_function")(None) == "lazy"
+    assert not mreg.pending_dmx
+
+
+def test_failing_dmx_file_is_not_skipped(tmp_path):
+    good = tmp_path / "good.dmx.py"
+    good.write_text(
+        "def main(register):\n"
+        "    @register.compmethod\n"
+        "    def good(ctx):\n"
+        "        return 'good'\n"
+    )
+    bad = tmp_path / "bad.dmx.py"
+    bad.write_text(
+        "def main(register):\n"
+        "    @register.compmethod\n"
+        "    def partial(ctx):\n"
+        "        return 'partial'\n"
+        "    raise ValueError('broken')\n"
+    )
+
+    mreg = method_register.MethodRegister()
+    mreg.load_from_dmx(tmp_path)
+
+    # The failing file stays pending, so every lookup fails rather than quietly falling back
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            mreg.get("Comp", "good")
+    assert bad in mreg.pending_dmx
+    assert ("Comp", "partial") not in mreg.methods
+
+    bad.write_text("def main(register):\n    pass\n")
+    assert mreg.get("Comp", "good")(None) == "good"
+    assert not mreg.pending_dmx
@@ -0,0 +1,29 @@
+"""
+Utilities unit tests.
+"""
+from datamatic import utilities
+
+
+def test_find_files(tmp_path):
+    (tmp_path / "nested" / "deeper").mkdir(parents=True)
+    (tmp_path / "top.dm.cpp").touch()
+    (tmp_path / "top.cpp").touch()
+    (tmp_path / "nested" / "mid.dm.h").touch()
+    (tmp_path / "nested" / "deeper" / "low.dm.py").touch()
+    (tmp_path / "nested" / "deeper" / "plugin.dmx.py").touch()
+
+    found = set(utilities.find_files(tmp_path, lambda name: ".dm." in name))
+    assert found == {
+        tmp_path / "top.dm.cpp",
+        tmp_path / "nested" / "mid.dm.h",
+        tmp_path / "nested" / "deeper" / "low.dm.py",
+    }
+
+
+def test_find_files_exclude(tmp_path):
+    (tmp_path / "cache").mkdir()
+    (tmp_path / "cache" / "entry.dm.cpp").touch()
+    (tmp_path / "kept.dm.cpp").touch()
+
+    found = set(utilities.find_files(tmp_path, lambda name: ".dm." in name, tmp_path / "cache"))
+    assert found == {tmp_path / "kept.dm.cpp"}